@@ -1,11 +1,15 @@
 import asyncio
 import logging
+import signal
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 import os
+import uvloop
 
 from integrations.whatsapp import WhatsAppIntegration
 from services.ai_processor import AIProcessor
 from services.command_handler import CommandHandler
+from services.semantic_cache import SemanticCache
 from data.database import MessageDatabase
 from models.message import Message
 
@@ -33,29 +37,55 @@ class LoveBot:
             },
             'database': {
                 'connection_string': os.getenv('MONGODB_CONNECTION_STRING'),
-                'database_name': 'lovebot'
+                'database_name': 'lovebot',
+                'redis_url': os.getenv('REDIS_URL')
+            },
+            'cache': {
+                # Separate from REDIS_URL: the semantic cache needs RediSearch
+                'redis_url': os.getenv('SEMANTIC_CACHE_REDIS_URL')
             }
         }
         
         # Initialize components
         self.whatsapp = WhatsAppIntegration(self.config['whatsapp'])
-        self.ai_processor = AIProcessor()
+        redis_url = self.config['cache']['redis_url']
+        semantic_cache = SemanticCache(redis_url) if redis_url else None
+        self.ai_processor = AIProcessor(semantic_cache)
         self.command_handler = CommandHandler()
         self.database = MessageDatabase(self.config['database'])
+        
+        # Set on SIGINT/SIGTERM to shut down
+        self._stop = asyncio.Event()
     
     async def start(self):
         """Start the bot"""
         logger.info("Starting LoveBot")
         
-        # Initialize WhatsApp connection
-        await self.whatsapp.initialize()
-        
-        # Subscribe to incoming messages
-        self.whatsapp.subscribe_to_messages(self.handle_message)
-        
-        # Keep the application running
-        while True:
-            await asyncio.sleep(60)
+        # Components are closed below even if startup fails part way, since their
+        # HTTP and Redis clients exist from construction on
+        try:
+            # Initialize WhatsApp connection
+            await self.whatsapp.initialize()
+            await self.database.initialize()
+            await self.ai_processor.initialize()
+            
+            # Subscribe to incoming messages
+            self.whatsapp.subscribe_to_messages(self.handle_message)
+            
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, self._stop.set)
+            
+            # Keep the application running until asked to stop
+            await self._stop.wait()
+        finally:
+            logger.info("Stopping LoveBot")
+            # Flush queued database writes first; one failing close must not skip the others
+            for close in (self.database.close, self.whatsapp.close, self.ai_processor.close):
+                try:
+                    await close()
+                except Exception as e:
+                    logger.error(f"Error during shutdown: {str(e)}")
     
     async def handle_message(self, message_data):
         """
@@ -64,25 +94,32 @@ class LoveBot:
         Args:
             message_data: Raw message data from WhatsApp
         """
+        group = message_data.get('group_id', '')
+        
         # Convert to our message model
         message = Message(
             sender=message_data['from'],
-            group=message_data.get('group_id', ''),
+            group=group,
             content=message_data['body'],
-            timestamp=datetime.now(),
+            timestamp=datetime.now(timezone.utc),
             message_id=message_data.get('id', '')
         )
         
-        # Store message
-        await self.database.store_message(message)
+        # Store message while checking for a command; the two are independent
+        store_task = asyncio.create_task(self.database.store_message(message))
         
-        # Process as command if applicable
-        is_command = await self.command_handler.process_command(message)
+        try:
+            # Process as command if applicable
+            is_command = await self.command_handler.process_command(message)
+        finally:
+            # History below must include the message just stored, and a failing
+            # command must neither lose the message nor leave the task unawaited
+            await store_task
         if is_command:
             return
         
         # Get conversation history
-        history = await self.database.get_conversation_history(message.group, limit=50)
+        history = await self.database.get_recent_history(group, limit=50)
         
         # Process with AI
         processed = await self.ai_processor.process_message(message, history)
@@ -92,9 +129,9 @@ class LoveBot:
             # Generate and send a response
             # This would involve calling a response generation service
             response = "I noticed there might be some tension. Remember to use 'I' statements."
-            await self.whatsapp.send_message(message.group, response)
+            await self.whatsapp.send_message(group, response)
 
 # Run the bot
 if __name__ == "__main__":
     bot = LoveBot()
-    asyncio.run(bot.start()) 
\ No newline at end of file
+    uvloop.run(bot.start()) 
\ No newline at end of file
@@ -1,7 +1,60 @@
-from typing import List, Dict, Any, Optional
-import motor.motor_asyncio
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import List, Dict, Any, Optional, Deque, Iterable, Tuple
+import bson
+import msgpack
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from bson.raw_bson import RawBSONDocument
+from pymongo import AsyncMongoClient
+from pymongo.errors import BulkWriteError
 from models.message import Message
 
+# Seconds a cached history page may be served before going back to MongoDB. Each bot
+# process only reads a group's history once (see get_recent_history), but with several
+# processes behind the webhook the first messages of a conversation reach different
+# processes within seconds, and a restart reloads every active group at once; both
+# are served from one MongoDB query per group. Invalidating costs one pipelined
+# round trip per written batch, not per message.
+HISTORY_CACHE_TTL = 30
+
+# Seconds a group's generation counter is kept after its last invalidation, so groups
+# that went quiet don't leave a key behind forever. A missing generation only makes
+# CACHE_PAGE_SCRIPT skip a write; it must outlive any single history read, since a
+# counter recreated from scratch could repeat the value that read started with.
+HISTORY_GENERATION_TTL = 24 * 60 * 60
+
+# Writes a history page only if the group's generation is still the one read before
+# querying MongoDB. Invalidation bumps the generation before deleting the pages, so a
+# page built from a read that raced with an insert is either skipped or deleted.
+# KEYS: pages hash, generation; ARGV: expected generation, limit, page, TTL
+CACHE_PAGE_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '') == ARGV[1] then
+    redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+"""
+
+# Messages per group kept in memory for get_recent_history
+RECENT_HISTORY_SIZE = 50
+
+# Pending writes are flushed with insert_many once this many are queued...
+WRITE_BATCH_SIZE = 50
+# ...or this many seconds after the first one was queued
+WRITE_BATCH_DELAY = 0.1
+# Seconds close() waits for queued messages to be written; kept well under the usual
+# SIGTERM grace period, since with MongoDB unreachable each batch waits out server selection
+WRITE_FLUSH_TIMEOUT = 5
+
+# Maximum number of messages returned by get_relevant_messages
+RELEVANT_MESSAGES_LIMIT = 20
+
+# Name of the group-prefixed text index created by initialize
+TEXT_INDEX_NAME = 'group_id_1_content_text'
+
 class MessageDatabase:
     """Database interface for message storage and retrieval"""
     
@@ -12,24 +65,202 @@ class MessageDatabase:
         Args:
             config: Database configuration
         """
-        self.client = motor.motor_asyncio.AsyncIOMotorClient(config['connection_string'])
+        # tz_aware so stored timestamps come back as the UTC datetimes they were written as
+        self.client = AsyncMongoClient(config['connection_string'], tz_aware=True)
         self.db = self.client[config['database_name']]
         self.messages = self.db.messages
+        # Optional Redis cache in front of get_conversation_history
+        redis_url = config.get('redis_url')
+        self.redis = redis.from_url(redis_url) if redis_url else None
+        self._cache_page = self.redis.register_script(CACHE_PAGE_SCRIPT) if self.redis else None
+        self.logger = logging.getLogger(__name__)
+        # Recent messages per group, oldest first, loaded from MongoDB on first use
+        self._history: Dict[str, Deque[Message]] = {}
+        # (group ID, encoded document) pairs waiting to be written by the background writer
+        self._write_queue: asyncio.Queue = asyncio.Queue()
+        self._writer: Optional[asyncio.Task] = None
+        # Messages queued or being written that haven't been handed to MongoDB yet
+        self._unwritten = 0
+    
+    async def initialize(self) -> None:
+        """Create the indexes used by the queries below and start the background writer"""
+        # Covers the per-group history query including its sort
+        await self.messages.create_index([('group_id', 1), ('timestamp', -1)])
+        await self._create_text_index()
+        self._writer = asyncio.create_task(self._write_batches())
+        self._writer.add_done_callback(self._writer_stopped)
+    
+    async def _create_text_index(self) -> None:
+        """Create the text index used by get_relevant_messages, unless one already exists"""
+        # A collection can only have one text index. Deployments created before this index
+        # was added already have their own one on content, which the $text query keeps using.
+        indexes = await self.messages.index_information()
+        for name, index in indexes.items():
+            if any(kind == 'text' for _, kind in index['key']):
+                if name != TEXT_INDEX_NAME:
+                    self.logger.warning(
+                        f"Keeping existing text index '{name}'; drop it to let '{TEXT_INDEX_NAME}' "
+                        f"scope text search to one group"
+                    )
+                return
+        
+        # Text search is always scoped to one group, so group_id can prefix the text index
+        await self.messages.create_index([('group_id', 1), ('content', 'text')], name=TEXT_INDEX_NAME)
+    
+    async def close(self) -> None:
+        """Write any queued messages and close connections"""
+        if self._writer:
+            if not self._writer.done():
+                try:
+                    await asyncio.wait_for(self._write_queue.join(), WRITE_FLUSH_TIMEOUT)
+                except asyncio.TimeoutError:
+                    # Whatever is still unwritten is reported below
+                    pass
+            if self._unwritten:
+                self.logger.error(f"Dropping {self._unwritten} messages that could not be stored before shutdown")
+            self._writer.cancel()
+        await self.client.close()
+        if self.redis:
+            await self.redis.aclose()
         
     async def store_message(self, message: Message) -> None:
         """
         Store a message in the database
         
+        The message is added to the in-memory history right away and
+        queued for a batched write to MongoDB.
+        
         Args:
             message: The message to store
         """
-        await self.messages.insert_one({
-            'user_id': message.sender,
-            'group_id': message.group,
-            'content': message.content,
-            'timestamp': message.timestamp,
-            # Store only what's necessary based on privacy settings
-        })
+        history = self._history.get(message.group)
+        if history is None:
+            history = await self._load_history(message.group)
+        history.append(message)
+        
+        self._write_queue.put_nowait((message.group, _encode_message(message)))
+        self._unwritten += 1
+    
+    async def _write_batches(self) -> None:
+        """Background task writing queued documents to MongoDB in batches"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + WRITE_BATCH_DELAY
+            while len(batch) < WRITE_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self._insert_batch(batch)
+            except Exception as e:
+                self.logger.error(f"Failed to write batch of {len(batch)} messages: {str(e)}")
+            finally:
+                self._unwritten -= len(batch)
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    def _writer_stopped(self, writer: asyncio.Task) -> None:
+        """
+        Report the background writer exiting other than through close()
+        
+        Args:
+            writer: The finished writer task
+        """
+        if not writer.cancelled() and writer.exception():
+            self.logger.error(
+                f"Background writer stopped, messages will no longer be stored: {str(writer.exception())}"
+            )
+    
+    async def _insert_batch(self, batch: List[Tuple[str, RawBSONDocument]]) -> None:
+        """
+        Write a batch of documents and invalidate the affected cached history
+        
+        Args:
+            batch: (group ID, encoded document) pairs to write
+        """
+        # PyMongo already retries the insert once on retryable errors (retryWrites),
+        # so failures here are logged; those messages only remain in memory
+        group_ids = {group_id for group_id, _ in batch}
+        try:
+            await self.messages.insert_many([document for _, document in batch], ordered=False)
+        except BulkWriteError as e:
+            # Unordered, so every document without a write error was stored
+            write_errors = e.details.get('writeErrors', [])
+            lost_group_ids = sorted({batch[error['index']][0] for error in write_errors})
+            self.logger.error(
+                f"Failed to store {len(write_errors)} of {len(batch)} messages "
+                f"(groups: {', '.join(lost_group_ids)}): {str(e)}"
+            )
+        except Exception as e:
+            self.logger.error(
+                f"Failed to store {len(batch)} messages (groups: {', '.join(sorted(group_ids))}): {str(e)}"
+            )
+            return
+        
+        await self._invalidate_history(group_ids)
+    
+    async def _invalidate_history(self, group_ids: Iterable[str]) -> None:
+        """
+        Drop the cached history pages of groups that received new messages
+        
+        Args:
+            group_ids: The WhatsApp group IDs
+        """
+        if not self.redis:
+            return
+        
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for group_id in group_ids:
+                    generation_key = _history_generation_key(group_id)
+                    # Bump the generation first so in-flight reads don't cache what they fetched
+                    pipe.incr(generation_key)
+                    pipe.expire(generation_key, HISTORY_GENERATION_TTL)
+                    # One hash per group holds every cached page, so a single DEL invalidates all of them
+                    pipe.delete(_history_cache_key(group_id))
+                await pipe.execute()
+        except RedisError as e:
+            self.logger.error(f"Failed to invalidate cached history: {str(e)}")
+    
+    async def get_recent_history(self, group_id: str, limit: int = RECENT_HISTORY_SIZE) -> List[Message]:
+        """
+        Retrieve recent conversation history from memory
+        
+        Only the first call for a group queries MongoDB. At most
+        RECENT_HISTORY_SIZE messages are kept per group.
+        
+        Args:
+            group_id: The WhatsApp group ID
+            limit: Maximum number of messages to retrieve
+            
+        Returns:
+            List of message objects, newest first
+        """
+        history = self._history.get(group_id)
+        if history is None:
+            history = await self._load_history(group_id)
+        return list(islice(reversed(history), limit))
+    
+    async def _load_history(self, group_id: str) -> Deque[Message]:
+        """
+        Populate the in-memory history of a group from MongoDB
+        
+        Args:
+            group_id: The WhatsApp group ID
+            
+        Returns:
+            The group's in-memory history
+        """
+        messages = await self.get_conversation_history(group_id, limit=RECENT_HISTORY_SIZE)
+        history = deque(reversed(messages), maxlen=RECENT_HISTORY_SIZE)
+        # Another coroutine may have loaded the group while this one was waiting
+        return self._history.setdefault(group_id, history)
     
     async def get_conversation_history(self, group_id: str, limit: int = 100) -> List[Message]:
         """
@@ -42,20 +273,61 @@ class MessageDatabase:
         Returns:
             List of message objects
         """
-        cursor = self.messages.find({'group_id': group_id}) \
+        cache_key = _history_cache_key(group_id)
+        generation_key = _history_generation_key(group_id)
+        # None when the cache is disabled or unavailable; the page is then not cached either
+        generation = None
+        if self.redis:
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.hget(cache_key, limit)
+                    pipe.get(generation_key)
+                    cached, generation = await pipe.execute()
+                generation = generation or b''
+            except RedisError as e:
+                self.logger.error(f"Failed to read cached history: {str(e)}")
+                cached = None
+            
+            if cached is not None:
+                return [
+                    Message(
+                        sender=user_id,
+                        group=group,
+                        content=content,
+                        timestamp=datetime.fromisoformat(timestamp)
+                    )
+                    for user_id, group, content, timestamp in msgpack.unpackb(cached)
+                ]
+        
+        projection = {'user_id': 1, 'group_id': 1, 'content': 1, 'timestamp': 1, '_id': 0}
+        cursor = self.messages.find({'group_id': group_id}, projection) \
                               .sort('timestamp', -1) \
                               .limit(limit)
         
-        messages = []
-        async for document in cursor:
-            messages.append(Message(
+        documents = await cursor.to_list(limit)
+        
+        if generation is not None:
+            rows = [
+                (document['user_id'], document['group_id'], document['content'], document['timestamp'].isoformat())
+                for document in documents
+            ]
+            try:
+                await self._cache_page(
+                    keys=[cache_key, generation_key],
+                    args=[generation, limit, msgpack.packb(rows), HISTORY_CACHE_TTL]
+                )
+            except RedisError as e:
+                self.logger.error(f"Failed to cache history: {str(e)}")
+        
+        return [
+            Message(
                 sender=document['user_id'],
                 group=document['group_id'],
                 content=document['content'],
                 timestamp=document['timestamp']
-            ))
-        
-        return messages
+            )
+            for document in documents
+        ]
     
     async def get_relevant_messages(self, topics: List[str], group_id: str) -> List[Message]:
         """
@@ -66,23 +338,57 @@ class MessageDatabase:
             group_id: The WhatsApp group ID
             
         Returns:
-            List of relevant messages
+            List of relevant messages, most relevant first
         """
-        # Full-text search for related messages
+        # Full-text search for related messages, ranked by the server
         query = {
             'group_id': group_id,
             '$text': {'$search': ' '.join(topics)}
         }
+        projection = {
+            'score': {'$meta': 'textScore'},
+            'user_id': 1, 'group_id': 1, 'content': 1, 'timestamp': 1, '_id': 0
+        }
+        cursor = self.messages.find(query, projection) \
+                              .sort([('score', {'$meta': 'textScore'})]) \
+                              .limit(RELEVANT_MESSAGES_LIMIT)
         
-        cursor = self.messages.find(query)
-        
-        messages = []
-        async for document in cursor:
-            messages.append(Message(
+        documents = await cursor.to_list(RELEVANT_MESSAGES_LIMIT)
+        return [
+            Message(
                 sender=document['user_id'],
                 group=document['group_id'],
                 content=document['content'],
                 timestamp=document['timestamp']
-            ))
+            )
+            for document in documents
+        ]
+
+def _encode_message(message: Message) -> RawBSONDocument:
+    """
+    Encode a message as a ready-to-send BSON document
+    
+    PyMongo writes raw documents as-is, without walking and validating
+    a dict or adding an _id (the server assigns one).
+    
+    Args:
+        message: The message to encode
         
-        return messages 
\ No newline at end of file
+    Returns:
+        The encoded document
+    """
+    return RawBSONDocument(bson.encode({
+        'user_id': message.sender,
+        'group_id': message.group,
+        'content': message.content,
+        'timestamp': message.timestamp,
+        # Store only what's necessary based on privacy settings
+    }))
+
+def _history_cache_key(group_id: str) -> str:
+    """Redis key of the cached history pages for a group"""
+    return f'lovebot:history:{group_id}'
+
+def _history_generation_key(group_id: str) -> str:
+    """Redis key of the counter bumped whenever a group's cached history is invalidated"""
+    return f'lovebot:history-generation:{group_id}'
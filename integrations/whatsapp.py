@@ -1,7 +1,34 @@
 import logging
+from datetime import timedelta
+from functools import lru_cache
 from typing import Callable, Dict, Any
-import requests
-from twilio.rest import Client
+import httpx
+from aiobreaker import CircuitBreaker, CircuitBreakerError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+TWILIO_API_URL = 'https://api.twilio.com/2010-04-01'
+
+@lru_cache(maxsize=4096)
+def whatsapp_address(number: str) -> str:
+    """Twilio address for a WhatsApp phone number or group ID"""
+    return f"whatsapp:{number}"
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether a failed API request may succeed if retried (rate limits, server or network errors)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status_code = error.response.status_code
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+# Transport errors raised before the request reached Twilio. Others, like a read
+# timeout, may come after the message was created, so retrying could send it twice.
+UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether a failed API request can be retried without risking a duplicate message"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return is_transient_error(error)
+    return isinstance(error, UNSENT_REQUEST_ERRORS)
 
 class WhatsAppIntegration:
     """Integration with WhatsApp Business API"""
@@ -15,7 +42,21 @@ class WhatsAppIntegration:
         """
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self.client = Client(config['account_sid'], config['auth_token'])
+        self.sender_address = whatsapp_address(config['phone_number'])
+        # Pooled, keep-alive HTTP/2 client so sends reuse one TLS connection
+        self.http = httpx.AsyncClient(
+            http2=True,
+            auth=(config['account_sid'], config['auth_token']),
+            base_url=f"{TWILIO_API_URL}/Accounts/{config['account_sid']}/",
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+        # Stops calling the API for 30s after 5 consecutive transient failures;
+        # other errors (e.g. an invalid recipient) don't count towards opening it
+        self.breaker = CircuitBreaker(
+            fail_max=5,
+            timeout_duration=timedelta(seconds=30),
+            exclude=[lambda error: not is_transient_error(error)]
+        )
         self.webhook_handlers = {}
         
     async def initialize(self) -> None:
@@ -24,6 +65,10 @@ class WhatsAppIntegration:
         # Setup webhook endpoints, verify connection, etc.
         # Specific implementation depends on which WhatsApp API service you use
     
+    async def close(self) -> None:
+        """Close pooled connections to the WhatsApp API"""
+        await self.http.aclose()
+    
     async def send_message(self, recipient: str, message: str) -> Dict[str, Any]:
         """
         Send a message to a WhatsApp user or group
@@ -36,17 +81,40 @@ class WhatsAppIntegration:
             Response data from the API
         """
         try:
-            message = self.client.messages.create(
-                from_=f"whatsapp:{self.config['phone_number']}",
-                body=message,
-                to=f"whatsapp:{recipient}"
-            )
-            self.logger.debug(f"Sent message to {recipient}: {message.sid}")
-            return {"status": "success", "message_id": message.sid}
+            message_sid = await self.breaker.call_async(self._create_message, {
+                'From': self.sender_address,
+                'Body': message,
+                'To': whatsapp_address(recipient)
+            })
+            self.logger.debug(f"Sent message to {recipient}: {message_sid}")
+            return {"status": "success", "message_id": message_sid}
+        except CircuitBreakerError as e:
+            self.logger.warning(f"Not sending message, WhatsApp API unavailable: {str(e)}")
+            return {"status": "circuit_open"}
         except Exception as e:
             self.logger.error(f"Failed to send message: {str(e)}")
             return {"status": "error", "error": str(e)}
     
+    @retry(
+        wait=wait_exponential(multiplier=0.2, max=5),
+        stop=stop_after_attempt(3),
+        retry=retry_if_exception(is_retryable_error),
+        reraise=True
+    )
+    async def _create_message(self, data: Dict[str, str]) -> str:
+        """
+        Create a message through the Twilio API, retrying failures that can't duplicate it
+        
+        Args:
+            data: Form fields of the message
+            
+        Returns:
+            SID of the created message
+        """
+        response = await self.http.post('Messages.json', data=data)
+        response.raise_for_status()
+        return response.json()['sid']
+    
     async def send_private_message(self, user_id: str, message: str) -> Dict[str, Any]:
         """
         Send a direct private message to an individual
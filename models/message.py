@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Message:
     """Represents a WhatsApp message"""
     sender: str
@@ -11,7 +11,7 @@ class Message:
     timestamp: datetime
     message_id: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class NLPResult:
     """Results from NLP analysis"""
     entities: List[Dict[str, Any]]
@@ -19,7 +19,7 @@ class NLPResult:
     topics: List[str]
     tokens: List[str]
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SentimentResult:
     """Results from sentiment analysis"""
     score: float  # -1.0 to 1.0
@@ -28,10 +28,10 @@ class SentimentResult:
     is_negative: bool
     is_neutral: bool
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ProcessedMessage:
     """A message with processing results"""
     original_message: Message
     nlp_result: NLPResult
     sentiment: SentimentResult
-    relevant_context: List[Message] 
\ No newline at end of file
+    relevant_context: List[Message]
\ No newline at end of file
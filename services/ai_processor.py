@@ -1,17 +1,76 @@
 from typing import Dict, List, Any, Optional
+import asyncio
+import logging
+import spacy
 from .nlp_service import NLPService
 from .sentiment_analyzer import SentimentAnalyzer
 from .context_manager import ContextManager
-from models.message import Message, ProcessedMessage
+from .semantic_cache import SemanticCache
+from .negativity_filter import NegativityFilter
+from models.message import Message, NLPResult, ProcessedMessage, SentimentResult
+
+# spaCy model whose static word vectors are used for semantic cache lookups of NLP results
+EMBEDDING_MODEL = 'en_core_web_md'
+# Pipeline components of the model; none are needed to look up word vectors
+EMBEDDING_MODEL_PIPES = ['tok2vec', 'tagger', 'parser', 'senter', 'attribute_ruler', 'lemmatizer', 'ner']
+
+# Assumed for messages without any negative cue, instead of asking the sentiment analyzer
+NEUTRAL_SENTIMENT = SentimentResult(
+    score=0.0,
+    magnitude=0.0,
+    is_positive=False,
+    is_negative=False,
+    is_neutral=True
+)
 
 class AIProcessor:
     """Processes messages using AI capabilities"""
     
-    def __init__(self):
-        """Initialize AI processing components"""
+    def __init__(self, semantic_cache: Optional[SemanticCache] = None):
+        """
+        Initialize AI processing components
+        
+        Args:
+            semantic_cache: Optional cache of results for similar messages
+        """
         self.nlp_service = NLPService()
         self.sentiment_analyzer = SentimentAnalyzer()
         self.context_manager = ContextManager()
+        self.negativity_filter = NegativityFilter()
+        self.semantic_cache = semantic_cache
+        self.logger = logging.getLogger(__name__)
+        # Loaded once with only the tokenizer and vectors, the rest is never run
+        self.embedder = spacy.load(EMBEDDING_MODEL, exclude=EMBEDDING_MODEL_PIPES) if semantic_cache else None
+    
+    async def initialize(self) -> None:
+        """Prepare the semantic cache index, if caching is enabled"""
+        if not self.semantic_cache:
+            return
+        
+        try:
+            await self.semantic_cache.initialize(self.embedder.vocab.vectors_length)
+        except Exception as e:
+            # The cache is optional; run without it rather than failing to start
+            self.logger.error(f"Semantic cache disabled, failed to create index: {str(e)}")
+            self.semantic_cache = None
+    
+    async def close(self) -> None:
+        """Close the semantic cache connection, if caching is enabled"""
+        if self.semantic_cache:
+            await self.semantic_cache.close()
+    
+    def embed(self, text: str) -> Optional[List[float]]:
+        """
+        Compute an embedding of the text for semantic cache lookups
+        
+        Args:
+            text: The text to embed
+            
+        Returns:
+            Averaged word vectors, or None if no token has a vector
+        """
+        vector = self.embedder.make_doc(text).vector
+        return vector.tolist() if vector.any() else None
     
     async def process_message(self, message: Message, conversation_history: List[Message]) -> ProcessedMessage:
         """
@@ -24,11 +83,19 @@ class AIProcessor:
         Returns:
             ProcessedMessage with analysis results
         """
-        # Extract entities, intent and key topics
-        nlp_result = await self.nlp_service.analyze(message.content)
+        embedding = self.embed(message.content) if self.semantic_cache else None
         
-        # Analyze sentiment
-        sentiment = await self.sentiment_analyzer.analyze(message.content)
+        if not self.negativity_filter.has_negative_cues(message.content):
+            # Nothing negative to score; context tracking still needs the NLP result
+            nlp_result = await self._analyze_nlp(message, embedding)
+            sentiment = NEUTRAL_SENTIMENT
+        else:
+            # Extract entities, intent and key topics, and analyze sentiment,
+            # concurrently since both only depend on the message text
+            nlp_result, sentiment = await asyncio.gather(
+                self._analyze_nlp(message, embedding),
+                self.sentiment_analyzer.analyze(message.content)
+            )
         
         # Update context with new information
         self.context_manager.update_context(message, nlp_result, sentiment)
@@ -43,6 +110,27 @@ class AIProcessor:
             relevant_context=relevant_context
         )
     
+    async def _analyze_nlp(self, message: Message, embedding: Optional[List[float]]) -> NLPResult:
+        """
+        Run NLP analysis, reusing the result of a near-identical message if one is cached
+        
+        Args:
+            message: The message to analyze
+            embedding: Embedding of the message content, or None to skip the cache
+            
+        Returns:
+            NLP analysis of the message
+        """
+        if embedding:
+            cached = await self.semantic_cache.lookup(message.group, embedding)
+            if cached:
+                return cached
+        
+        nlp_result = await self.nlp_service.analyze(message.content)
+        if embedding:
+            await self.semantic_cache.store(message.group, embedding, nlp_result)
+        return nlp_result
+    
     def should_respond(self, processed_message: ProcessedMessage) -> bool:
         """
         Determine if the bot should respond to this message
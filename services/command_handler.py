@@ -1,7 +1,13 @@
 from typing import Dict, List, Any, Callable, Optional
 import asyncio
+import re
 from models.message import Message
 
+COMMAND_PREFIX = '#lovebot'
+# Command name, which may follow the prefix directly as in '#lovebothelp', then
+# optional arguments (which may span several lines)
+COMMAND_PATTERN = re.compile(r'#lovebot\s*(\w+)(?:\s+(.*))?', re.DOTALL)
+
 class CommandHandler:
     """Handles #lovebot commands from users"""
     
@@ -29,12 +35,16 @@ class CommandHandler:
         Returns:
             True if the message was a command and was processed, False otherwise
         """
-        if not message.content.startswith('#lovebot'):
+        # Cheap prefix check first so ordinary chat never reaches the regex engine
+        if not message.content.startswith(COMMAND_PREFIX):
+            return False
+        
+        match = COMMAND_PATTERN.fullmatch(message.content.rstrip())
+        if not match:
             return False
         
-        parts = message.content[len('#lovebot'):].strip().split(' ')
-        command = parts[0].lower() if parts else ''
-        args = parts[1:] if len(parts) > 1 else []
+        command = match.group(1).lower()
+        args = (match.group(2) or '').split()
         
         if command in self.commands:
             await self.commands[command](args, message)
@@ -0,0 +1,146 @@
+from typing import Iterable
+import ahocorasick
+
+# Negations (seeded from VADER's list), conflict, hurt, insult and distress vocabulary.
+# Entries are matched as whole words; a trailing '*' marks a stem that also matches
+# any word it starts (e.g. 'annoy*' matches annoyed, annoying, annoyance). Stems are
+# only used where they can't swallow common neutral words ('yell*' would hit yellow).
+NEGATIVE_CUES = (
+    # Negations
+    "ain't", "aint", "aren't", "arent", "can't", "cant", "cannot", "couldn't", "couldnt",
+    "daren't", "darent", "didn't", "didnt", "doesn't", "doesnt", "don't", "dont",
+    "hadn't", "hadnt", "hasn't", "hasnt", "haven't", "havent", "isn't", "isnt",
+    "mightn't", "mightnt", "mustn't", "mustnt", "needn't", "neednt", "oughtn't",
+    "oughtnt", "shan't", "shant", "shouldn't", "shouldnt", "wasn't", "wasnt", "weren't",
+    "werent", "won't", "wont", "wouldn't", "wouldnt", "neither", "never", "no", "nobody",
+    "none", "nope", "nor", "not", "nothing", "nowhere", "uh-uh", "uhuh", "without",
+    "rarely", "seldom", "despite", "hardly", "barely", "nah",
+    # Anger and conflict
+    "anger*", "angry", "angrier", "angriest", "annoy*", "argu*", "attack*", "bitter*",
+    "blam*", "enrag*", "fed up", "fight*", "fought", "furious*", "fury",
+    "hate", "hated", "hater*", "hates", "hateful*", "hating", "hatred", "hostil*",
+    "infuriat*", "irritat*", "livid", "mad", "madder", "maddening", "outrag*", "pissed",
+    "pissing", "rage", "raging", "resent*", "seething", "scream*", "shout*", "snap at",
+    "snapped", "snapping", "temper", "yell", "yelled", "yelling", "yells", "fuming",
+    "aggravat*", "exasperat*", "provok*", "confront*", "quarrel*", "bicker*", "row with",
+    "grudge*", "spite*", "vengeful", "revenge", "sick of", "tired of", "had enough",
+    "done with", "over it", "whatever", "enough already",
+    # Dismissal and stonewalling
+    "shut up", "go away", "leave me alone", "get lost", "piss off", "back off",
+    "don't care", "dont care", "who cares", "not listening", "stop it", "stop talking",
+    "silent treatment", "ignor*", "dismiss*", "stonewall*", "walk out", "walked out",
+    "walking out", "slam*", "hung up on", "blocked", "unfollow*",
+    # Profanity
+    "fuck*", "fck*", "fk", "f off", "f*ck*", "motherfuck*", "wtf", "stfu", "ffs",
+    "shit*", "bullshit*", "bs", "crap*", "damn*", "dammit", "goddamn*", "hell", "hellish",
+    "bloody", "piss", "sod off", "screw you", "screw this", "screwed", "suck", "sucks",
+    "sucked", "sucky",
+    # Insults
+    "asshole*", "arsehole*", "ass", "dumbass*", "jackass*", "bastard*", "bitch*",
+    "cunt*", "dick", "dickhead*", "douche*", "prick*", "twat*", "wanker*", "slut*",
+    "whore*", "jerk*", "loser*", "idiot*", "moron*", "imbecile*", "retard*", "stupid*",
+    "dumb", "dumber", "dumbest", "fool", "fools", "foolish*", "clown", "pathetic*",
+    "useless*", "worthless*", "hopeless*", "spineless*", "gutless", "heartless*",
+    "selfish*", "lazy", "laziness", "slob", "pig", "creep*", "freak*", "psycho",
+    "psychotic", "crazy", "insane", "nutcase", "lunatic*", "weirdo*", "scum*", "trash",
+    "garbage", "disgrace*", "embarrassment", "liar*", "fake", "fraud*", "two-faced",
+    "hypocrit*", "childish*", "immature*", "ridiculous*", "incompetent*", "clueless",
+    "ungrateful*", "inconsiderate*", "insensitive*", "rude*", "nasty", "gross", "toxic*",
+    "cruel*", "mean to me", "narcissis*", "manipulat*", "controlling", "gaslight*",
+    "abus*", "bully*", "bullied", "bullies", "condescend*", "patroniz*", "patronis*",
+    "arrogant*", "obnoxious*", "disrespect*", "contempt*", "despis*", "detest*",
+    "loath*", "disgust*", "repuls*", "revolting", "vile", "pig-headed", "stubborn*",
+    # Criticism and absolutes
+    "always", "every time", "every single time", "you never", "your fault", "fault",
+    "faults", "awful*", "terribl*", "horribl*", "horrid", "dreadful*", "atrocious*",
+    "bad", "worse", "worst", "wrong", "mistake*", "fail*", "ruin*", "mess", "messed up",
+    "messing", "careless*", "irresponsible*", "unreliable*", "untrustworthy", "unfair*",
+    "selfishly", "complain*", "nag", "nags", "nagged", "nagging", "whine", "whined",
+    "whines", "whining", "whiny", "whinge*", "moan*", "bother*", "boring", "bored",
+    "critici*", "judg*", "insult*", "offend*", "offens*", "humiliat*",
+    "belittl*", "mock*", "sarcas*", "lecture me", "lecturing", "ugh", "argh", "smh",
+    "eye roll", "seriously?", "unbelievable", "typical", "as usual",
+    # Hurt and sadness
+    "abandon*", "alone", "ashamed", "betray*", "broken", "broke my", "cried", "cries",
+    "cry", "crying", "crushed", "depress*", "devastat*", "disappoint*", "distraught",
+    "empty inside", "grief", "griev*", "heartbr*", "heavy heart", "helpless*",
+    "homesick", "hurt*", "lonel*", "lost without", "miser*", "mourn*", "neglect*",
+    "numb", "pain", "painful*", "reject*", "sad", "sadder", "saddest", "sadly", "sadness",
+    "sob", "sobbed", "sobbing", "sorrow*", "suffer*", "tear", "tears", "tearful*",
+    "teary", "unhappy", "unhappi*", "unloved", "unwanted", "unappreciated", "upset*",
+    "wounded", "gutted", "let down", "let me down", "left out", "invisible",
+    "taken for granted",
+    "don't feel loved", "doesn't love", "don't love", "not loved", "no longer love",
+    "regret*", "sorry", "apolog*", "guilt*", "shame*", "embarrass*",
+    # Jealousy and trust
+    "jealous*", "envious", "envy", "suspicious*", "suspect*", "distrust*", "mistrust*",
+    "trust issues", "cheat*", "affair", "flirt*", "lie", "lied", "lies", "lying",
+    "deceiv*", "deceit*", "decept*", "sneaky", "sneaking", "secretly", "secrets",
+    "hiding something",
+    "behind my back", "two-timing", "unfaithful*", "disloyal*", "stalk*", "snoop*",
+    # Anxiety and overwhelm
+    "afraid", "anxious*", "anxiety", "apprehensive", "dread*", "exhaust*", "fear*",
+    "frantic*", "frighten*", "frustrat*", "nervous*", "overwhelm*", "panic*", "scared",
+    "scare", "scares", "scary", "stress*", "tense", "tension*", "terrified", "terrifying",
+    "uneasy", "worri*", "worry", "worrying", "burnt out", "burned out", "burnout",
+    "drained", "at my limit", "breaking point", "can't cope", "cant cope", "can't take",
+    "cant take", "falling apart", "losing it", "lose it", "freaking out", "freak out",
+    "on edge", "insecur*", "desperate*", "trapped", "suffocat*", "smother*",
+    "pressure*", "overthink*",
+    # Relationship breakdown
+    "break up", "breaking up", "broke up", "breakup*", "split up", "splitting up",
+    "divorc*", "separat*", "leave you", "leaving you", "left me", "leave me",
+    "move out", "moving out", "moved out", "kick you out", "kicked me out", "dumped",
+    "dump you", "it's over", "its over", "we're done", "were done", "we are done",
+    "over between us", "end this", "ending this", "end it", "give up on", "gave up on",
+    "giving up", "never again", "not working", "doesn't work", "can't do this",
+    "cant do this", "waste of time", "wasted", "pointless", "meaningless", "no point",
+    "sleep on the couch", "single again",
+    # Threats and danger
+    "threat*", "hit me", "hit you", "slap*", "punch*", "kick*", "shove*", "push me",
+    "hurt you", "kill*", "murder*", "die", "dying", "dead", "death", "suicid*",
+    "self-harm", "self harm", "harm myself", "end my life", "violen*", "assault*",
+    "afraid of you", "scared of you", "unsafe", "danger*", "weapon*", "police",
+    "restraining order", "nightmare*", "hell on earth", "tortur*", "agony", "cursed",
+    "ruined", "destroyed", "destroy*", "wreck*",
+    # Emoji
+    "😡", "😠", "🤬", "😤", "😢", "😭", "💔", "🙄", "😒", "😞", "😔", "😩", "😫", "😖",
+    "😣", "😟", "😥", "😰", "😨", "😱", "🖕", "👎", "😾", "☹", "🙁", "😕", "😑",
+)
+
+class NegativityFilter:
+    """Cheap lexicon scan for negative cues, used to skip remote sentiment analysis"""
+
+    def __init__(self, lexicon: Iterable[str] = NEGATIVE_CUES):
+        """
+        Build the Aho-Corasick automaton for the lexicon
+
+        Args:
+            lexicon: Lower-case words and phrases that signal negativity, '*' marking stems
+        """
+        self.automaton = ahocorasick.Automaton()
+        for cue in lexicon:
+            is_stem = cue.endswith('*')
+            cue = cue.rstrip('*')
+            # WhatsApp clients often send typographic apostrophes
+            for variant in {cue, cue.replace("'", "’")}:
+                self.automaton.add_word(variant, (len(variant), is_stem))
+        self.automaton.make_automaton()
+
+    def has_negative_cues(self, text: str) -> bool:
+        """
+        Check whether the text contains any lexicon entry
+
+        Args:
+            text: The text to scan
+
+        Returns:
+            True if at least one negative cue was found
+        """
+        text = text.lower()
+        for end, (length, is_stem) in self.automaton.iter(text):
+            start = end - length + 1
+            if (start == 0 or not text[start - 1].isalnum()) and \
+               (is_stem or end + 1 == len(text) or not text[end + 1].isalnum()):
+                return True
+        return False
@@ -0,0 +1,135 @@
+import json
+import logging
+import re
+import uuid
+from array import array
+from dataclasses import asdict
+from typing import List, Optional
+
+import redis.asyncio as redis
+from redis.commands.search.field import TagField, VectorField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+from redis.exceptions import RedisError, ResponseError
+
+from models.message import NLPResult
+
+# Characters that must be escaped inside a RediSearch TAG query
+_TAG_ESCAPE = re.compile(r'([^A-Za-z0-9_])')
+
+class SemanticCache:
+    """
+    Redis-backed cache of NLP results keyed by message embedding
+
+    Sentiment is never cached: averaged word vectors barely change with negation
+    or antonyms ("I don't love you" vs "I don't hate you"), so a similar message
+    can easily have the opposite sentiment.
+    """
+
+    def __init__(self, redis_url: str, similarity_threshold: float = 0.92,
+                 ttl_seconds: int = 4 * 60 * 60, index_name: str = 'lovebot:semcache'):
+        """
+        Initialize the semantic cache
+
+        Args:
+            redis_url: Connection URL of a Redis server with RediSearch
+            similarity_threshold: Minimum cosine similarity for a cache hit
+            ttl_seconds: How long cached entries are kept
+            index_name: Name of the vector index, also used as key prefix
+        """
+        self.redis = redis.from_url(redis_url)
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.index_name = index_name
+        self.key_prefix = f'{index_name}:'
+        self.logger = logging.getLogger(__name__)
+
+    async def initialize(self, dimensions: int) -> None:
+        """
+        Create the HNSW vector index if it does not exist yet
+
+        Args:
+            dimensions: Length of the embedding vectors
+        """
+        schema = (
+            TagField('group'),
+            VectorField('vec', 'HNSW', {
+                'TYPE': 'FLOAT32',
+                'DIM': dimensions,
+                'DISTANCE_METRIC': 'COSINE'
+            })
+        )
+        definition = IndexDefinition(prefix=[self.key_prefix], index_type=IndexType.HASH)
+        try:
+            await self.redis.ft(self.index_name).create_index(schema, definition=definition)
+        except ResponseError as e:
+            if 'already exists' not in str(e).lower():
+                raise
+
+    async def close(self) -> None:
+        """Close the Redis connection"""
+        await self.redis.aclose()
+
+    async def lookup(self, group_id: str, embedding: List[float]) -> Optional[NLPResult]:
+        """
+        Find the NLP result of the most similar message in the same group
+
+        Args:
+            group_id: The WhatsApp group ID
+            embedding: Embedding of the message content
+
+        Returns:
+            Cached NLP result, or None on a miss or Redis error
+        """
+        group_tag = _TAG_ESCAPE.sub(r'\\\1', _group_tag(group_id))
+        query = Query(f'(@group:{{{group_tag}}})=>[KNN 1 @vec $vec AS score]') \
+            .return_fields('score', 'result') \
+            .dialect(2)
+        try:
+            results = await self.redis.ft(self.index_name).search(
+                query, query_params={'vec': _to_bytes(embedding)}
+            )
+        except RedisError as e:
+            self.logger.error(f"Semantic cache lookup failed: {str(e)}")
+            return None
+        if not results.docs:
+            return None
+
+        # COSINE distance is reported as 1 - cosine similarity
+        document = results.docs[0]
+        if 1.0 - float(document.score) < self.similarity_threshold:
+            return None
+
+        payload = json.loads(document.result)
+        return NLPResult(**payload['nlp_result'])
+
+    async def store(self, group_id: str, embedding: List[float], nlp_result: NLPResult) -> None:
+        """
+        Cache the NLP result of a message; Redis errors are logged and ignored
+
+        Args:
+            group_id: The WhatsApp group ID
+            embedding: Embedding of the message content
+            nlp_result: NLP analysis of the message
+        """
+        key = f'{self.key_prefix}{uuid.uuid4().hex}'
+        result = json.dumps({'nlp_result': asdict(nlp_result)})
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hset(key, mapping={
+                    'group': _group_tag(group_id),
+                    'vec': _to_bytes(embedding),
+                    'result': result
+                })
+                pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+        except RedisError as e:
+            self.logger.error(f"Semantic cache store failed: {str(e)}")
+
+def _group_tag(group_id: str) -> str:
+    """TAG value for a group ID (private chats have no group)"""
+    return group_id or 'direct'
+
+def _to_bytes(embedding: List[float]) -> bytes:
+    """Pack an embedding as the FLOAT32 blob RediSearch expects"""
+    return array('f', embedding).tobytes()
@@ -1,13 +1,18 @@
 import os
+import stat
+import sys
 import logging
 import asyncio
 from dotenv import load_dotenv, find_dotenv
 print("Loaded .env file:", find_dotenv())
-from twilio.rest import Client
+import httpx
+import msgspec
 import uvicorn
+import uvloop
 from fastapi import FastAPI, Request, Response
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 
 # Configure logging
 logging.basicConfig(
@@ -19,7 +24,7 @@ logger = logging.getLogger("whatsapp-test")
 # Load environment variables
 load_dotenv()
 
-# Initialize Twilio client
+# Initialize Twilio API client
 twilio_account_sid = os.getenv("TWILIO_ACCOUNT_SID")
 twilio_auth_token = os.getenv("TWILIO_AUTH_TOKEN")
 whatsapp_phone_number = os.getenv("WHATSAPP_PHONE_NUMBER")
@@ -28,28 +33,58 @@ if not all([twilio_account_sid, twilio_auth_token, whatsapp_phone_number]):
     logger.error("Missing required environment variables. Please check your .env file.")
     exit(1)
 
-client = Client(twilio_account_sid, twilio_auth_token)
+# Shares the event loop with the webhook server, so sending never blocks it
+http_client = httpx.AsyncClient(
+    http2=True,
+    auth=(twilio_account_sid, twilio_auth_token),
+    base_url=f"https://api.twilio.com/2010-04-01/Accounts/{twilio_account_sid}/"
+)
 
 # Initialize FastAPI app for webhooks
 app = FastAPI(title="WhatsApp Bot Webhook Receiver")
 
+class TwilioWebhook(msgspec.Struct):
+    """Fields of a Twilio WhatsApp webhook used by the test tool"""
+    From: str = ""
+    Body: Optional[str] = None
+    MessageSid: str = ""
+
+webhook_decoder = msgspec.json.Decoder(TwilioWebhook)
+
 @app.post("/webhook")
 async def webhook_receiver(request: Request):
     """
     Receive incoming webhook notifications from Twilio WhatsApp
+    
+    Accepts Twilio's default form-encoded payload as well as JSON.
     """
-    # Get the raw data
-    form_data = await request.form()
+    debug = logger.isEnabledFor(logging.DEBUG)
     
-    # Log the incoming webhook data
-    logger.info("Received webhook data:")
-    for key, value in form_data.items():
-        logger.info(f"  {key}: {value}")
+    if request.headers.get("content-type", "").startswith("application/json"):
+        raw_body = await request.body()
+        if debug:
+            logger.debug(f"Received webhook data: {raw_body.decode(errors='replace')}")
+        try:
+            webhook = webhook_decoder.decode(raw_body)
+        except msgspec.DecodeError as e:
+            logger.error(f"Invalid webhook payload: {str(e)}")
+            return Response(status_code=400)
+    else:
+        form_data = await request.form()
+        if debug:
+            logger.debug("Received webhook data:")
+            for key, value in form_data.items():
+                logger.debug(f"  {key}: {value}")
+        webhook = TwilioWebhook(
+            From=form_data.get('From', ''),
+            Body=form_data.get('Body'),
+            MessageSid=form_data.get('MessageSid', '')
+        )
     
     # Parse WhatsApp message
-    if 'Body' in form_data:
-        from_number = form_data.get('From', '').replace('whatsapp:', '')
-        body = form_data.get('Body', '')
+    if webhook.Body is not None:
+        from_number = webhook.From.replace('whatsapp:', '')
+        body = webhook.Body
         
         logger.info(f"Received message from {from_number}: {body}")
         
@@ -73,18 +108,65 @@ async def send_test_message(to_number: str, message_body: str):
         to_whatsapp = f"whatsapp:{to_number}"
         
         # Send the message
-        message = client.messages.create(
-            from_=f"whatsapp:{whatsapp_phone_number}",
-            body=message_body,
-            to=to_whatsapp
-        )
+        response = await http_client.post("Messages.json", data={
+            "From": f"whatsapp:{whatsapp_phone_number}",
+            "Body": message_body,
+            "To": to_whatsapp
+        })
+        response.raise_for_status()
+        message_sid = response.json()["sid"]
         
-        logger.info(f"Sent message to {to_number}: {message.sid}")
-        return {"status": "success", "message_id": message.sid}
+        logger.info(f"Sent message to {to_number}: {message_sid}")
+        return {"status": "success", "message_id": message_sid}
     except Exception as e:
         logger.error(f"Failed to send message: {str(e)}")
         return {"status": "error", "error": str(e)}
 
+async def open_stdin() -> Optional[asyncio.StreamReader]:
+    """
+    Attach a stream reader to stdin so reading never blocks the event loop
+    
+    Returns:
+        Reader for stdin; it buffers, so several lines pasted at once are all kept.
+        None if stdin is a regular file or a device like /dev/null, which the event
+        loop can't watch; those never block for long and are read in a thread.
+    """
+    mode = os.fstat(sys.stdin.fileno()).st_mode
+    if not (stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode) or sys.stdin.isatty()):
+        return None
+    
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    # The transport closes what it's given at end of input; hand it a duplicate so stdin stays open
+    pipe = os.fdopen(os.dup(sys.stdin.fileno()), 'rb', buffering=0)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    return reader
+
+async def read_input(reader: Optional[asyncio.StreamReader], prompt: str) -> str:
+    """
+    Read a line from stdin
+    
+    Args:
+        reader: Reader returned by open_stdin
+        prompt: Text to show before reading
+        
+    Returns:
+        The line read, without the trailing newline
+    """
+    print(prompt, end="", flush=True)
+    try:
+        if reader:
+            line = await reader.readline()
+        else:
+            line = await asyncio.to_thread(sys.stdin.buffer.readline)
+    except OSError as e:
+        # e.g. the terminal went away; only a failure to read ends interactive mode,
+        # writes can fail too since a terminal's stdout shares its non-blocking mode
+        raise EOFError(str(e)) from e
+    if not line:
+        raise EOFError
+    return line.decode().rstrip("\n")
+
 async def interactive_mode():
     """
     Run an interactive mode to send and receive messages
@@ -94,39 +176,55 @@ async def interactive_mode():
     logger.info("2. Enter recipient's phone number with country code (e.g. +1234567890)")
     logger.info("3. Type your message")
     
-    while True:
-        try:
-            to_number = input("\nRecipient's phone number: ")
-            if not to_number:
-                continue
-                
-            message = input("Message to send: ")
-            if not message:
-                continue
+    try:
+        reader = await open_stdin()
+    except (OSError, ValueError) as e:
+        # e.g. stdin closed
+        logger.error(f"Cannot read from stdin, exiting interactive mode: {str(e)}")
+        return
+    
+    try:
+        while True:
+            try:
+                to_number = await read_input(reader, "\nRecipient's phone number: ")
+                if not to_number:
+                    continue
+                    
+                message = await read_input(reader, "Message to send: ")
+                if not message:
+                    continue
+                    
+                logger.info("Sending message...")
+                await send_test_message(to_number, message)
                 
-            logger.info("Sending message...")
-            await send_test_message(to_number, message)
-            
-        except KeyboardInterrupt:
-            logger.info("Exiting interactive mode")
-            break
-        except Exception as e:
-            logger.error(f"Error: {str(e)}")
+            except EOFError:
+                logger.info("Exiting interactive mode")
+                break
+            except Exception as e:
+                logger.error(f"Error: {str(e)}")
+    finally:
+        # connect_read_pipe switched stdin to non-blocking, which would leak into the shell
+        if reader:
+            os.set_blocking(sys.stdin.fileno(), True)
 
-# Run the FastAPI app for webhooks
-def start_webhook_server():
-    """Start the webhook server in a separate process"""
+# Run the FastAPI app for webhooks alongside interactive mode
+async def main():
+    """Serve webhooks and run interactive mode on the same event loop"""
     logger.info("Starting webhook server on http://localhost:8000")
     logger.info("Configure your Twilio webhook URL to point to http://YOUR_PUBLIC_URL/webhook")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=8000, http="httptools"))
+    
+    # Leaving interactive mode stops the server; Ctrl+C stops the server, then interactive mode
+    interactive = asyncio.create_task(interactive_mode())
+    interactive.add_done_callback(lambda _: setattr(server, "should_exit", True))
+    try:
+        await server.serve()
+    finally:
+        interactive.cancel()
+        await http_client.aclose()
 
 if __name__ == "__main__":
-    import sys
-    import threading
-    
-    # Start webhook server in a separate thread
-    webhook_thread = threading.Thread(target=start_webhook_server, daemon=True)
-    webhook_thread.start()
-    
-    # Start interactive mode
-    asyncio.run(interactive_mode()) 
\ No newline at end of file
+    try:
+        uvloop.run(main())
+    except KeyboardInterrupt:
+        pass 
\ No newline at end of file